@@ -1,14 +1,54 @@
+import asyncio
 import datetime
 import logging.config
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from environs import Env
 from seller import download_stock
 
 import requests
 
-from seller import divide, price_conversion
+from seller import (
+    create_session,
+    divide,
+    encode_json,
+    gather_batches,
+    index_remnants,
+    price_conversion,
+    rate_limit,
+    stock_conversion,
+)
 
 logger = logging.getLogger(__file__)
 
+ENDPOINT_URL = "https://api.partner.market.yandex.ru/"
+
+_SESSION = create_session()
+
+# Лимиты запросов к API Яндекс.Маркет в минуту, отдельно для каждого метода.
+# Это консервативные значения по умолчанию: при изменении лимитов
+# маркетплейса их достаточно поправить здесь.
+MARKET_OFFER_MAPPING_PER_MINUTE = 100
+MARKET_STOCKS_PER_MINUTE = 100
+MARKET_PRICES_PER_MINUTE = 100
+
+# Все запросы к API Яндекс.Маркет идут через один пул: его размер — предел
+# одновременных запросов к маркетплейсу за весь запуск.
+MARKET_MAX_CONCURRENT_REQUESTS = 8
+_EXECUTOR = ThreadPoolExecutor(
+    max_workers=MARKET_MAX_CONCURRENT_REQUESTS, thread_name_prefix="yandex"
+)
+
+
+@lru_cache(maxsize=4)
+def _market_headers(access_token):
+    """Заголовки запросов к API Яндекс.Маркет, общие для всех вызовов с токеном."""
+    return {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {access_token}",
+        "Accept": "application/json",
+    }
+
 
 def get_product_list(page, campaign_id, access_token):
 
@@ -29,19 +69,17 @@ def get_product_list(page, campaign_id, access_token):
         Note:
             Убедитесь, что access_token действителен, иначе запрос вернёт ошибку.
         """
-    endpoint_url = "https://api.partner.market.yandex.ru/"
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {access_token}",
-        "Accept": "application/json",
-        "Host": "api.partner.market.yandex.ru",
-    }
+    headers = _market_headers(access_token)
     payload = {
         "page_token": page,
         "limit": 200,
     }
-    url = endpoint_url + f"campaigns/{campaign_id}/offer-mapping-entries"
-    response = requests.get(url, headers=headers, params=payload)
+    url = f"{ENDPOINT_URL}campaigns/{campaign_id}/offer-mapping-entries"
+    rate_limit(
+        ("yandex", campaign_id, "offer-mapping-entries"),
+        MARKET_OFFER_MAPPING_PER_MINUTE,
+    )
+    response = _SESSION.get(url, headers=headers, params=payload)
     response.raise_for_status()
     response_object = response.json()
     return response_object.get("result")
@@ -72,16 +110,11 @@ def update_stocks(stocks, campaign_id, access_token):
             >>> update_stocks([], "wrong_campaign_id", "invalid_access_token")
             requests.exceptions.HTTPError: 401 Unauthorized
         """
-    endpoint_url = "https://api.partner.market.yandex.ru/"
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {access_token}",
-        "Accept": "application/json",
-        "Host": "api.partner.market.yandex.ru",
-    }
+    headers = _market_headers(access_token)
     payload = {"skus": stocks}
-    url = endpoint_url + f"campaigns/{campaign_id}/offers/stocks"
-    response = requests.put(url, headers=headers, json=payload)
+    url = f"{ENDPOINT_URL}campaigns/{campaign_id}/offers/stocks"
+    rate_limit(("yandex", campaign_id, "offers/stocks"), MARKET_STOCKS_PER_MINUTE)
+    response = _SESSION.put(url, headers=headers, data=encode_json(payload))
     response.raise_for_status()
     response_object = response.json()
     return response_object
@@ -113,16 +146,13 @@ def update_price(prices, campaign_id, access_token):
         >>> update_price([], "wrong_campaign_id", "invalid_access_token")
         requests.exceptions.HTTPError: 401 Unauthorized
     """
-    endpoint_url = "https://api.partner.market.yandex.ru/"
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {access_token}",
-        "Accept": "application/json",
-        "Host": "api.partner.market.yandex.ru",
-    }
+    headers = _market_headers(access_token)
     payload = {"offers": prices}
-    url = endpoint_url + f"campaigns/{campaign_id}/offer-prices/updates"
-    response = requests.post(url, headers=headers, json=payload)
+    url = f"{ENDPOINT_URL}campaigns/{campaign_id}/offer-prices/updates"
+    rate_limit(
+        ("yandex", campaign_id, "offer-prices/updates"), MARKET_PRICES_PER_MINUTE
+    )
+    response = _SESSION.post(url, headers=headers, data=encode_json(payload))
     response.raise_for_status()
     response_object = response.json()
     return response_object
@@ -152,19 +182,57 @@ def get_offer_ids(campaign_id, market_token):
         []
     """
     page = ""
-    product_list = []
+    offer_ids = []
     while True:
         some_prod = get_product_list(page, campaign_id, market_token)
-        product_list.extend(some_prod.get("offerMappingEntries"))
+        # Берём из страницы только артикулы, чтобы не держать в памяти весь каталог:
+        offer_ids.extend(
+            product.get("offer").get("shopSku")
+            for product in some_prod.get("offerMappingEntries")
+        )
         page = some_prod.get("paging").get("nextPageToken")
         if not page:
             break
-    offer_ids = []
-    for product in product_list:
-        offer_ids.append(product.get("offer").get("shopSku"))
     return offer_ids
 
 
+def _stock_item_template():
+    """Запись об остатке с нулевым количеством и текущим временем обновления.
+
+    Время одно на всю выгрузку, поэтому записи для товаров получаются
+    копированием шаблона, а не сборкой словаря заново.
+    """
+    date = str(datetime.datetime.utcnow().replace(microsecond=0).isoformat() + "Z")
+    return {"count": 0, "type": "FIT", "updatedAt": date}
+
+
+def _stock_record(offer_id, watch, warehouse_id, item_template):
+    """Запись об остатке товара для Яндекс.Маркет.
+
+    Товар, которого нет в файле остатков (watch is None), получает нулевой остаток.
+    """
+    item = item_template.copy()
+    if watch is not None:
+        item["count"] = stock_conversion(watch.get("Количество"))
+    return {"sku": offer_id, "warehouseId": warehouse_id, "items": [item]}
+
+
+def _price_record(offer_id, watch):
+    """Запись о цене товара для Яндекс.Маркет по строке из файла остатков."""
+    return {
+        "id": offer_id,
+        # "feed": {"id": 0},
+        "price": {
+            "value": int(price_conversion(watch.get("Цена"))),
+            # "discountBase": 0,
+            "currencyId": "RUR",
+            # "vat": 0,
+        },
+        # "marketSku": 0,
+        # "shopSku": "string",
+    }
+
+
 def create_stocks(watch_remnants, offer_ids, warehouse_id):
     """Создает список остатков товаров на основе данных о наличии и идентификаторов предложений.
 
@@ -201,45 +269,13 @@ def create_stocks(watch_remnants, offer_ids, warehouse_id):
          []
      """
     stocks = list()
-    date = str(datetime.datetime.utcnow().replace(microsecond=0).isoformat() + "Z")
-    for watch in watch_remnants:
-        if str(watch.get("Код")) in offer_ids:
-            count = str(watch.get("Количество"))
-            if count == ">10":
-                stock = 100
-            elif count == "1":
-                stock = 0
-            else:
-                stock = int(watch.get("Количество"))
-            stocks.append(
-                {
-                    "sku": str(watch.get("Код")),
-                    "warehouseId": warehouse_id,
-                    "items": [
-                        {
-                            "count": stock,
-                            "type": "FIT",
-                            "updatedAt": date,
-                        }
-                    ],
-                }
-            )
-            offer_ids.remove(str(watch.get("Код")))
-    # Добавим недостающее из загруженного:
-    for offer_id in offer_ids:
-        stocks.append(
-            {
-                "sku": offer_id,
-                "warehouseId": warehouse_id,
-                "items": [
-                    {
-                        "count": 0,
-                        "type": "FIT",
-                        "updatedAt": date,
-                    }
-                ],
-            }
-        )
+    if not offer_ids:
+        return stocks
+    remnants_by_code = index_remnants(watch_remnants)
+    item_template = _stock_item_template()
+    for offer_id in dict.fromkeys(offer_ids):
+        watch = remnants_by_code.get(offer_id)
+        stocks.append(_stock_record(offer_id, watch, warehouse_id, item_template))
     return stocks
 
 
@@ -276,43 +312,132 @@ def create_prices(watch_remnants, offer_ids):
         []
     """
     prices = []
-    for watch in watch_remnants:
-        if str(watch.get("Код")) in offer_ids:
-            price = {
-                "id": str(watch.get("Код")),
-                # "feed": {"id": 0},
-                "price": {
-                    "value": int(price_conversion(watch.get("Цена"))),
-                    # "discountBase": 0,
-                    "currencyId": "RUR",
-                    # "vat": 0,
-                },
-                # "marketSku": 0,
-                # "shopSku": "string",
-            }
-            prices.append(price)
+    if not offer_ids:
+        return prices
+    remnants_by_code = index_remnants(watch_remnants)
+    for offer_id in dict.fromkeys(offer_ids):
+        watch = remnants_by_code.get(offer_id)
+        if watch is not None:
+            prices.append(_price_record(offer_id, watch))
     return prices
 
 
+def build_stocks_and_prices(watch_remnants, offer_ids, warehouse_id):
+    """Создает остатки и цены товаров за один проход по артикулам.
+
+    Результат совпадает с вызовами create_stocks и create_prices, но код,
+    количество и цена каждого товара разбираются только один раз.
+
+    Args:
+        watch_remnants (list): Список словарей с информацией о товарах,
+                               включая "Код", "Количество" и "Цена".
+        offer_ids (list): Список идентификаторов предложений (shopSku), которые уже загружены на маркет.
+        warehouse_id (str): Идентификатор склада, на котором хранятся товары.
+
+    Returns:
+        tuple: Пара списков (stocks, prices) в формате create_stocks и create_prices.
+
+    Example:
+        >>> watch_remnants = [{"Код": "SKU_1", "Количество": ">10", "Цена": "5'990.00 руб."}]
+        >>> stocks, prices = build_stocks_and_prices(watch_remnants, ["SKU_1", "SKU_2"], "WAREHOUSE_001")
+        >>> print(prices)
+        [{'id': 'SKU_1', 'price': {'value': 5990, 'currencyId': 'RUR'}}]
+
+    Example of incorrect execution:
+        >>> build_stocks_and_prices([], [], "WAREHOUSE_001")
+        ([], [])
+    """
+    stocks = []
+    prices = []
+    if not offer_ids:
+        return stocks, prices
+    remnants_by_code = index_remnants(watch_remnants)
+    item_template = _stock_item_template()
+    for offer_id in dict.fromkeys(offer_ids):
+        watch = remnants_by_code.get(offer_id)
+        stocks.append(_stock_record(offer_id, watch, warehouse_id, item_template))
+        if watch is not None:
+            prices.append(_price_record(offer_id, watch))
+    return stocks, prices
+
+
 async def upload_prices(watch_remnants, campaign_id, market_token):
-    offer_ids = get_offer_ids(campaign_id, market_token)
+    loop = asyncio.get_running_loop()
+    offer_ids = await loop.run_in_executor(
+        _EXECUTOR, get_offer_ids, campaign_id, market_token
+    )
     prices = create_prices(watch_remnants, offer_ids)
-    for some_prices in list(divide(prices, 500)):
-        update_price(some_prices, campaign_id, market_token)
+    await gather_batches(
+        _EXECUTOR, update_price, divide(prices, 500), campaign_id, market_token
+    )
     return prices
 
 
 async def upload_stocks(watch_remnants, campaign_id, market_token, warehouse_id):
-    offer_ids = get_offer_ids(campaign_id, market_token)
+    loop = asyncio.get_running_loop()
+    offer_ids = await loop.run_in_executor(
+        _EXECUTOR, get_offer_ids, campaign_id, market_token
+    )
     stocks = create_stocks(watch_remnants, offer_ids, warehouse_id)
-    for some_stock in list(divide(stocks, 2000)):
-        update_stocks(some_stock, campaign_id, market_token)
+    await gather_batches(
+        _EXECUTOR, update_stocks, divide(stocks, 2000), campaign_id, market_token
+    )
     not_empty = list(
         filter(lambda stock: (stock.get("items")[0].get("count") != 0), stocks)
     )
     return not_empty, stocks
 
 
+async def upload_campaigns(campaigns, market_token):
+    """Скачивает остатки и обновляет остатки и цены в нескольких кампаниях одновременно.
+
+    Файл остатков и артикулы всех кампаний загружаются параллельно, затем
+    пачки остатков и цен всех кампаний отправляются в API одновременно.
+
+    Args:
+        campaigns (list): Пары (campaign_id, warehouse_id) кампаний в Яндекс.Маркет.
+        market_token (str): Токен доступа для авторизации при выполнении API-запроса.
+
+    Example:
+        >>> campaigns = [("FBS_ID", "WAREHOUSE_FBS_ID"), ("DBS_ID", "WAREHOUSE_DBS_ID")]
+        >>> asyncio.run(upload_campaigns(campaigns, "your_market_token"))
+
+    Example of incorrect execution:
+        >>> asyncio.run(upload_campaigns([("wrong_id", "WAREHOUSE_001")], "invalid_token"))
+        requests.exceptions.HTTPError: 401 Unauthorized
+    """
+    # Постраничный обход артикулов последователен внутри кампании, поэтому
+    # параллельно запускаем независимые загрузки: файл остатков и все кампании.
+    loop = asyncio.get_running_loop()
+    watch_remnants, *campaigns_offer_ids = await asyncio.gather(
+        asyncio.to_thread(download_stock),
+        *[
+            loop.run_in_executor(_EXECUTOR, get_offer_ids, campaign_id, market_token)
+            for campaign_id, _ in campaigns
+        ],
+    )
+    uploads = []
+    for (campaign_id, warehouse_id), offer_ids in zip(campaigns, campaigns_offer_ids):
+        stocks, prices = build_stocks_and_prices(
+            watch_remnants, offer_ids, warehouse_id
+        )
+        uploads.append(
+            gather_batches(
+                _EXECUTOR,
+                update_stocks,
+                divide(stocks, 2000),
+                campaign_id,
+                market_token,
+            )
+        )
+        uploads.append(
+            gather_batches(
+                _EXECUTOR, update_price, divide(prices, 500), campaign_id, market_token
+            )
+        )
+    await asyncio.gather(*uploads)
+
+
 def main():
     env = Env()
     market_token = env.str("MARKET_TOKEN")
@@ -321,25 +446,12 @@ def main():
     warehouse_fbs_id = env.str("WAREHOUSE_FBS_ID")
     warehouse_dbs_id = env.str("WAREHOUSE_DBS_ID")
 
-    watch_remnants = download_stock()
+    campaigns = [
+        (campaign_fbs_id, warehouse_fbs_id),
+        (campaign_dbs_id, warehouse_dbs_id),
+    ]
     try:
-        # FBS
-        offer_ids = get_offer_ids(campaign_fbs_id, market_token)
-        # Обновить остатки FBS
-        stocks = create_stocks(watch_remnants, offer_ids, warehouse_fbs_id)
-        for some_stock in list(divide(stocks, 2000)):
-            update_stocks(some_stock, campaign_fbs_id, market_token)
-        # Поменять цены FBS
-        upload_prices(watch_remnants, campaign_fbs_id, market_token)
-
-        # DBS
-        offer_ids = get_offer_ids(campaign_dbs_id, market_token)
-        # Обновить остатки DBS
-        stocks = create_stocks(watch_remnants, offer_ids, warehouse_dbs_id)
-        for some_stock in list(divide(stocks, 2000)):
-            update_stocks(some_stock, campaign_dbs_id, market_token)
-        # Поменять цены DBS
-        upload_prices(watch_remnants, campaign_dbs_id, market_token)
+        asyncio.run(upload_campaigns(campaigns, market_token))
     except requests.exceptions.ReadTimeout:
         print("Превышено время ожидания...")
     except requests.exceptions.ConnectionError as error:
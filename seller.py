@@ -1,18 +1,189 @@
+import asyncio
+import contextlib
+import hashlib
 import io
+import json
 import logging.config
-import os
-import re
+import tempfile
+import threading
+import time
 import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from itertools import islice
+from pathlib import Path
 from environs import Env
 
-import pandas as pd
 import requests
+import xlrd
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 logger = logging.getLogger(__file__)
 
 
+def create_session():
+    """Создать HTTP-сессию с пулом соединений и повторами запросов.
+
+    Сессия переиспользует TCP/TLS-соединения между запросами к одному хосту
+    и повторяет запрос при временных ошибках сервера.
+
+    Returns:
+        requests.Session: Настроенная сессия.
+
+    Example:
+        >>> session = create_session()
+        >>> session.get("https://api-seller.ozon.ru")
+        <Response [200]>
+    """
+    session = requests.Session()
+    retries = Retry(
+        total=3,
+        backoff_factor=1,
+        status_forcelist=[429, 500, 502, 503, 504],
+        # Озон принимает всё через POST; обновления остатков и цен
+        # идемпотентны, поэтому повторять можно любой метод.
+        allowed_methods=None,
+        # Частоту запросов ограничивает rate_limit(); если лимит всё же
+        # превышен, ждём столько, сколько просит сервер в Retry-After.
+        respect_retry_after_header=True,
+        raise_on_status=False,  # итоговый ответ проверит raise_for_status()
+    )
+    adapter = HTTPAdapter(pool_connections=50, pool_maxsize=50, max_retries=retries)
+    session.mount("https://", adapter)
+    return session
+
+
+_SESSION = create_session()
+
+# Все запросы к API Озон идут через один пул: его размер — предел
+# одновременных запросов к маркетплейсу за весь запуск.
+OZON_MAX_CONCURRENT_REQUESTS = 8
+_EXECUTOR = ThreadPoolExecutor(
+    max_workers=OZON_MAX_CONCURRENT_REQUESTS, thread_name_prefix="ozon"
+)
+
+# Лимиты запросов к API Озон в минуту, отдельно для каждого метода. Это
+# консервативные значения по умолчанию: при изменении лимитов маркетплейса
+# их достаточно поправить здесь.
+OZON_PRODUCT_LIST_PER_MINUTE = 60
+OZON_STOCKS_PER_MINUTE = 80
+OZON_PRICES_PER_MINUTE = 80
+
+
+class TokenBucket:
+    """Ограничитель частоты запросов по алгоритму token bucket.
+
+    Корзина пополняется со скоростью requests_per_minute / 60 токенов в секунду
+    и вмещает минутный запас, так что пачку запросов в пределах лимита можно
+    отправить сразу. Каждый запрос забирает один токен, а если токенов нет —
+    ждёт пополнения. Потокобезопасен.
+
+    Args:
+        requests_per_minute (int): Допустимое количество запросов в минуту.
+
+    Example:
+        >>> bucket = TokenBucket(60)
+        >>> bucket.acquire()  # первые 60 запросов проходят сразу, дальше — раз в секунду
+    """
+
+    def __init__(self, requests_per_minute):
+        self.rate = requests_per_minute / 60
+        self.capacity = float(requests_per_minute)
+        self.request_tokens = self.capacity
+        self.last_update = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Забрать один токен, при необходимости дождавшись пополнения."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.request_tokens = min(
+                    self.capacity,
+                    self.request_tokens + (now - self.last_update) * self.rate,
+                )
+                self.last_update = now
+                if self.request_tokens >= 1:
+                    self.request_tokens -= 1
+                    return
+                wait = (1 - self.request_tokens) / self.rate
+            time.sleep(wait)
+
+
+_BUCKETS = {}
+_BUCKETS_LOCK = threading.Lock()
+
+
+def rate_limit(key, requests_per_minute):
+    """Дождаться своей очереди на запрос в рамках лимита key.
+
+    Все запросы с одинаковым key делят одну корзину TokenBucket, в каком бы
+    потоке они ни выполнялись. Ключ включает площадку, магазин или кампанию
+    и метод API, потому что маркетплейсы ограничивают каждый метод отдельно.
+
+    Args:
+        key (tuple): Ключ лимита, например ("ozon", client_id, "import/stocks").
+        requests_per_minute (int): Допустимое количество запросов в минуту.
+
+    Example:
+        >>> rate_limit(("ozon", "your_client_id", "import/stocks"), OZON_STOCKS_PER_MINUTE)
+    """
+    with _BUCKETS_LOCK:
+        bucket = _BUCKETS.get(key)
+        if bucket is None:
+            bucket = _BUCKETS[key] = TokenBucket(requests_per_minute)
+    bucket.acquire()
+
+
+STOCK_CACHE_TTL = 6 * 60 * 60  # секунд
+
+
+@lru_cache(maxsize=4)
+def _seller_headers(client_id, seller_token):
+    """Заголовки запросов к API Озон, общие для всех вызовов с этими ключами."""
+    return {
+        "Client-Id": client_id,
+        "Api-Key": seller_token,
+        "Content-Type": "application/json",
+    }
+
+
+def encode_json(payload):
+    """Сериализовать тело запроса в компактный JSON в кодировке UTF-8.
+
+    Без пробелов после разделителей и без экранирования кириллицы тело
+    пачки из тысяч товаров получается заметно меньше, чем при json=payload.
+
+    Args:
+        payload (dict): Тело запроса.
+
+    Returns:
+        bytes: JSON для передачи в data= запроса.
+
+    Example:
+        >>> encode_json({"stocks": [{"offer_id": "12345", "stock": 0}]})
+        b'{"stocks":[{"offer_id":"12345","stock":0}]}'
+    """
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+class _DigitsOnly(dict):
+    """Таблица для str.translate, оставляющая в строке только цифры 0-9."""
+
+    def __missing__(self, key):
+        # Запоминаем удаляемый символ, чтобы дальше поиск шёл без вызова Python.
+        self[key] = None
+        return None
+
+
+_DIGITS_ONLY = _DigitsOnly({ord(digit): digit for digit in "0123456789"})
+
+_STOCK_BY_COUNT = {">10": 100, "1": 0}
+
+
 def get_product_list(last_id, client_id, seller_token):
-     """Получить список товаров магазина Озон.
+    """Получить список товаров магазина Озон.
 
     Эта функция выполняет запрос к API Озон для получения списка
     товаров магазина, основываясь на указанном last_id. Запрос возвращает
@@ -36,10 +207,7 @@ def get_product_list(last_id, client_id, seller_token):
         Запрос может вернуть не более 1000 товаров за один раз.
     """
     url = "https://api-seller.ozon.ru/v2/product/list"
-    headers = {
-        "Client-Id": client_id,
-        "Api-Key": seller_token,
-    }
+    headers = _seller_headers(client_id, seller_token)
     payload = {
         "filter": {
             "visibility": "ALL",
@@ -47,7 +215,8 @@ def get_product_list(last_id, client_id, seller_token):
         "last_id": last_id,
         "limit": 1000,
     }
-    response = requests.post(url, json=payload, headers=headers)
+    rate_limit(("ozon", client_id, "product/list"), OZON_PRODUCT_LIST_PER_MINUTE)
+    response = _SESSION.post(url, json=payload, headers=headers)
     response.raise_for_status()
     response_object = response.json()
     return response_object.get("result")
@@ -78,17 +247,15 @@ def get_offer_ids(client_id, seller_token):
         Если товаров в магазине нет, возвращаемый список будет пустым.
     """
     last_id = ""
-    product_list = []
+    offer_ids = []
     while True:
         some_prod = get_product_list(last_id, client_id, seller_token)
-        product_list.extend(some_prod.get("items"))
+        # Берём из страницы только артикулы, чтобы не держать в памяти весь каталог:
+        offer_ids.extend(product.get("offer_id") for product in some_prod.get("items"))
         total = some_prod.get("total")
         last_id = some_prod.get("last_id")
-        if total == len(product_list):
+        if total == len(offer_ids):
             break
-    offer_ids = []
-    for product in product_list:
-        offer_ids.append(product.get("offer_id"))
     return offer_ids
 
 
@@ -133,12 +300,10 @@ def update_price(prices: list, client_id, seller_token):
             Если в списке prices не содержится действительных данных, функция может вызвать ошибку.
         """
     url = "https://api-seller.ozon.ru/v1/product/import/prices"
-    headers = {
-        "Client-Id": client_id,
-        "Api-Key": seller_token,
-    }
+    headers = _seller_headers(client_id, seller_token)
     payload = {"prices": prices}
-    response = requests.post(url, json=payload, headers=headers)
+    rate_limit(("ozon", client_id, "import/prices"), OZON_PRICES_PER_MINUTE)
+    response = _SESSION.post(url, data=encode_json(payload), headers=headers)
     response.raise_for_status()
     return response.json()
 
@@ -176,12 +341,10 @@ def update_stocks(stocks: list, client_id, seller_token):
            функция может вызвать ошибку.
        """
     url = "https://api-seller.ozon.ru/v1/product/import/stocks"
-    headers = {
-        "Client-Id": client_id,
-        "Api-Key": seller_token,
-    }
+    headers = _seller_headers(client_id, seller_token)
     payload = {"stocks": stocks}
-    response = requests.post(url, json=payload, headers=headers)
+    rate_limit(("ozon", client_id, "import/stocks"), OZON_STOCKS_PER_MINUTE)
+    response = _SESSION.post(url, data=encode_json(payload), headers=headers)
     response.raise_for_status()
     return response.json()
 
@@ -190,11 +353,15 @@ def download_stock():
     """Скачать файл с остатками товаров и вернуть их в виде списка.
 
        Эта функция загружает ZIP-архив с остатками товаров с заданного URL,
-       распаковывает его и считывает данные об остатках из файла Excel.
+       и считывает данные об остатках из файла Excel прямо в памяти.
        Возвращает список записей остатков с информацией о каждом товаре.
 
+       Разобранные остатки кэшируются в ~/.cache/seller-apis по ETag (или
+       Last-Modified) файла. Пока файл на сервере не изменился и кэшу меньше
+       STOCK_CACHE_TTL секунд, архив не скачивается повторно.
+
        Returns:
-           list: Список словарей, где каждый словарь содержит информацию о товаре,
+           list: Список словарей с ключами "Код", "Количество" и "Цена" для каждого товара.
 
        Example:
            >>> stock_data = download_stock()
@@ -206,23 +373,159 @@ def download_stock():
            # Если файл не доступен, возникнет ошибка HTTPError.
        """
     casio_url = "https://timeworld.ru/upload/files/ostatki.zip"
-    session = requests.Session()
-    response = session.get(casio_url)
+    # ZIP уже сжат, повторное сжатие на сервере только тратит время. HEAD и GET
+    # запрашивают одинаковую кодировку, иначе ETag у них может различаться.
+    identity = {"Accept-Encoding": "identity"}
+    # Если файл на сервере не менялся, берём уже разобранные остатки из кэша:
+    head = _SESSION.head(casio_url, headers=identity, allow_redirects=True)
+    if head.ok:
+        watch_remnants = _load_stock_cache(casio_url, head.headers)
+        if watch_remnants is not None:
+            return watch_remnants
+    response = _SESSION.get(casio_url, headers=identity)
     response.raise_for_status()
+    # Читаем файл прямо из архива в памяти, не распаковывая его на диск:
     with response, zipfile.ZipFile(io.BytesIO(response.content)) as archive:
-        archive.extractall(".")
-    # Создаем список остатков часов:
-    excel_file = "ostatki.xls"
-    watch_remnants = pd.read_excel(
-        io=excel_file,
-        na_values=None,
-        keep_default_na=False,
-        header=17,
-    ).to_dict(orient="records")
-    os.remove("./ostatki.xls")  # Удалить файл
+        book = xlrd.open_workbook(file_contents=archive.read("ostatki.xls"))
+    sheet = book.sheet_by_index(0)
+    # Заголовки таблицы в 18-й строке, ниже — остатки часов:
+    headers = sheet.row_values(17)
+    columns = [(name, headers.index(name)) for name in ("Код", "Количество", "Цена")]
+    watch_remnants = []
+    for row in range(18, sheet.nrows):
+        cells = sheet.row(row)
+        watch_remnants.append(
+            {name: _cell_value(cells[index]) for name, index in columns}
+        )
+    _save_stock_cache(casio_url, response.headers, watch_remnants)
     return watch_remnants
 
 
+def _stock_cache_path(url, headers):
+    """Путь к кэшу остатков для версии файла из заголовков ETag/Last-Modified.
+
+    Если сервер не сообщает версию файла, кэш не используется и функция
+    возвращает None.
+    """
+    version = headers.get("ETag") or headers.get("Last-Modified")
+    if not version:
+        return None
+    digest = hashlib.sha256(f"{url} {version}".encode()).hexdigest()
+    return _stock_cache_dir() / f"ostatki_{digest}.json"
+
+
+def _stock_cache_dir():
+    """Каталог кэша остатков текущего пользователя (~/.cache/seller-apis)."""
+    return Path.home() / ".cache" / "seller-apis"
+
+
+def _load_stock_cache(url, headers):
+    """Прочитать остатки из кэша, если он есть и не устарел.
+
+    Кэш необязателен: если его нельзя прочитать, пишем предупреждение
+    в лог и возвращаем None, чтобы остатки скачались заново.
+    """
+    try:
+        cache_path = _stock_cache_path(url, headers)
+        if cache_path is None or not cache_path.exists():
+            return None
+        if time.time() - cache_path.stat().st_mtime >= STOCK_CACHE_TTL:
+            return None
+        with cache_path.open(encoding="utf-8") as cache_file:
+            return json.load(cache_file)
+    except (OSError, ValueError, RuntimeError) as error:
+        logger.warning("Не удалось прочитать кэш остатков: %s", error)
+        return None
+
+
+def _save_stock_cache(url, headers, watch_remnants):
+    """Сохранить остатки в кэш и удалить кэши прежних версий файла.
+
+    Каталог кэша доступен только текущему пользователю: в кэше цены
+    и остатки, которые потом уходят на маркетплейсы. Ошибка записи кэша
+    не прерывает выгрузку — только пишется предупреждение в лог.
+    """
+    tmp_path = None
+    try:
+        cache_path = _stock_cache_path(url, headers)
+        if cache_path is None:
+            return
+        cache_dir = cache_path.parent
+        cache_dir.mkdir(mode=0o700, parents=True, exist_ok=True)
+        cache_dir.chmod(0o700)
+        for old_cache in cache_dir.glob("ostatki_*.json"):
+            if old_cache != cache_path:
+                old_cache.unlink(missing_ok=True)
+        # Пишем во временный файл с уникальным именем и переименовываем, чтобы
+        # параллельный запуск не прочитал недописанный кэш:
+        with tempfile.NamedTemporaryFile(
+            "w",
+            encoding="utf-8",
+            dir=cache_dir,
+            prefix="ostatki_",
+            suffix=".tmp",
+            delete=False,
+        ) as cache_file:
+            tmp_path = Path(cache_file.name)
+            json.dump(watch_remnants, cache_file, ensure_ascii=False)
+        tmp_path.replace(cache_path)
+    except (OSError, ValueError, RuntimeError) as error:
+        logger.warning("Не удалось сохранить кэш остатков: %s", error)
+        if tmp_path is not None:
+            with contextlib.suppress(OSError):
+                tmp_path.unlink(missing_ok=True)
+
+
+def _cell_value(cell):
+    """Вернуть значение ячейки, целые числа — как int, а не float."""
+    if cell.ctype == xlrd.XL_CELL_NUMBER and cell.value.is_integer():
+        return int(cell.value)
+    return cell.value
+
+
+def index_remnants(watch_remnants):
+    """Построить индекс остатков по коду товара.
+
+    Позволяет перебирать загруженные артикулы, которых обычно намного меньше,
+    чем строк в файле остатков, и находить для них строку за O(1).
+    Если код встречается в файле несколько раз, используется первая строка.
+
+    Args:
+        watch_remnants (list): Список словарей с информацией о товарах, содержащих "Код".
+
+    Returns:
+        dict: Словарь {код товара в виде строки: строка из файла остатков}.
+
+    Example:
+        >>> index_remnants([{"Код": 12345, "Количество": ">10"}])
+        {'12345': {'Код': 12345, 'Количество': '>10'}}
+    """
+    remnants_by_code = {}
+    for watch in watch_remnants:
+        remnants_by_code.setdefault(str(watch.get("Код")), watch)
+    return remnants_by_code
+
+
+def _stock_record(offer_id, watch):
+    """Запись об остатке товара для Озон.
+
+    Товар, которого нет в файле остатков (watch is None), получает нулевой остаток.
+    """
+    stock = 0 if watch is None else stock_conversion(watch.get("Количество"))
+    return {"offer_id": offer_id, "stock": stock}
+
+
+def _price_record(offer_id, watch):
+    """Запись о цене товара для Озон по строке из файла остатков."""
+    return {
+        "auto_action_enabled": "UNKNOWN",
+        "currency_code": "RUB",
+        "offer_id": offer_id,
+        "old_price": "0",
+        "price": price_conversion(watch.get("Цена")),
+    }
+
+
 def create_stocks(watch_remnants, offer_ids):
     """Создает список остатков для обновления на основе данных о товарах.
 
@@ -253,20 +556,11 @@ def create_stocks(watch_remnants, offer_ids):
             []
         """
     stocks = []
-    for watch in watch_remnants:
-        if str(watch.get("Код")) in offer_ids:
-            count = str(watch.get("Количество"))
-            if count == ">10":
-                stock = 100
-            elif count == "1":
-                stock = 0
-            else:
-                stock = int(watch.get("Количество"))
-            stocks.append({"offer_id": str(watch.get("Код")), "stock": stock})
-            offer_ids.remove(str(watch.get("Код")))
-    # Добавим недостающее из загруженного:
-    for offer_id in offer_ids:
-        stocks.append({"offer_id": offer_id, "stock": 0})
+    if not offer_ids:
+        return stocks
+    remnants_by_code = index_remnants(watch_remnants)
+    for offer_id in dict.fromkeys(offer_ids):
+        stocks.append(_stock_record(offer_id, remnants_by_code.get(offer_id)))
     return stocks
 
 
@@ -298,21 +592,56 @@ def create_prices(watch_remnants, offer_ids):
         []
     """
     prices = []
-    for watch in watch_remnants:
-        if str(watch.get("Код")) in offer_ids:
-            price = {
-                "auto_action_enabled": "UNKNOWN",
-                "currency_code": "RUB",
-                "offer_id": str(watch.get("Код")),
-                "old_price": "0",
-                "price": price_conversion(watch.get("Цена")),
-            }
-            prices.append(price)
+    if not offer_ids:
+        return prices
+    remnants_by_code = index_remnants(watch_remnants)
+    for offer_id in dict.fromkeys(offer_ids):
+        watch = remnants_by_code.get(offer_id)
+        if watch is not None:
+            prices.append(_price_record(offer_id, watch))
     return prices
 
 
+def build_stocks_and_prices(watch_remnants, offer_ids):
+    """Создает остатки и цены товаров за один проход по артикулам.
+
+    Результат совпадает с вызовами create_stocks и create_prices, но код,
+    количество и цена каждого товара разбираются только один раз.
+
+    Args:
+        watch_remnants (list): Список словарей с информацией о товарах, где каждый словарь
+                               содержит как минимум "Код", "Количество" и "Цена".
+        offer_ids (list): Список строк с идентификаторами предложений, которые уже загружены
+                          в систему продавцов.
+
+    Returns:
+        tuple: Пара списков (stocks, prices) в формате create_stocks и create_prices.
+
+    Example:
+        >>> watch_remnants = [{"Код": "12345", "Количество": ">10", "Цена": "5'990.00 руб."}]
+        >>> build_stocks_and_prices(watch_remnants, ["12345", "11111"])
+        ([{'offer_id': '12345', 'stock': 100}, {'offer_id': '11111', 'stock': 0}],
+         [{'auto_action_enabled': 'UNKNOWN', 'currency_code': 'RUB', 'offer_id': '12345', 'old_price': '0', 'price': '5990'}])
+
+    Example of incorrect use:
+        >>> build_stocks_and_prices([], [])
+        ([], [])
+    """
+    stocks = []
+    prices = []
+    if not offer_ids:
+        return stocks, prices
+    remnants_by_code = index_remnants(watch_remnants)
+    for offer_id in dict.fromkeys(offer_ids):
+        watch = remnants_by_code.get(offer_id)
+        stocks.append(_stock_record(offer_id, watch))
+        if watch is not None:
+            prices.append(_price_record(offer_id, watch))
+    return stocks, prices
+
+
 def price_conversion(price: str) -> str:
-      """Преобразовать цену из строки в целое число.
+    """Преобразовать цену из строки в целое число.
 
     Преобразует строковое представление цены, удаляя все символы,
     кроме чисел. Ожидается, что цена может содержать символы валюты и
@@ -332,18 +661,44 @@ def price_conversion(price: str) -> str:
     Raises:
         ValueError: Если input не является строкой.
     """
-    return re.sub("[^0-9]", "", price.split(".")[0])
+    return price.split(".", 1)[0].translate(_DIGITS_ONLY)
+
 
+def stock_conversion(count) -> int:
+    """Преобразовать количество товара из файла остатков в остаток для маркетплейса.
 
-def divide(lst: list, n: int):
+    Если товара больше 10 (">10"), возвращается 100, если 1 — 0,
+    иначе используется реальное количество.
+
+    Args:
+        count (str | int): Количество товара из колонки "Количество".
+
+    Returns:
+        int: Остаток товара для выгрузки.
+
+    Example:
+        >>> stock_conversion(">10")
+        100
+        >>> stock_conversion(5)
+        5
+
+    Raises:
+        ValueError: Если количество не является числом.
+    """
+    stock = _STOCK_BY_COUNT.get(count if isinstance(count, str) else str(count))
+    return int(count) if stock is None else stock
+
+
+def divide(lst, n: int):
     """Разделяет список на части заданного размера.
 
-    Эта функция принимает список и делит его на подсписки, каждый из которых содержит не более
-    чем n элементов. Если длина списка не делится на n, последний подсписок может содержать
-    меньше элементов.
+    Эта функция принимает список (или любой итерируемый объект) и делит его на подсписки,
+    каждый из которых содержит не более чем n элементов. Если длина списка не делится на n,
+    последний подсписок может содержать меньше элементов. Части выдаются по одной,
+    поэтому генератор на входе не материализуется целиком.
 
     Args:
-        lst (list): Список, который необходимо разделить.
+        lst (iterable): Список или итерируемый объект, который необходимо разделить.
         n (int): Максимальное количество элементов в каждом подсписке.
 
     Yields:
@@ -357,42 +712,107 @@ def divide(lst: list, n: int):
         >>> list(divide([], 2))
         []
     """
-    for i in range(0, len(lst), n):
-        yield lst[i : i + n]
+    iterator = iter(lst)
+    while batch := list(islice(iterator, n)):
+        yield batch
+
+
+async def gather_batches(executor, update, batches, *args):
+    """Отправляет пачки данных в API одновременно.
+
+    Каждая пачка передаётся в функцию update в пуле потоков executor, пока
+    цикл событий ждёт ответов. Пул общий для всех запросов к маркетплейсу,
+    поэтому его размер ограничивает число одновременных запросов к API,
+    сколько бы вызовов gather_batches ни выполнялось параллельно.
+
+    Args:
+        executor (ThreadPoolExecutor): Пул потоков маркетплейса, например _EXECUTOR.
+        update (callable): Функция отправки одной пачки, например update_stocks.
+        batches (iterable): Пачки данных, например результат divide().
+        *args: Остальные аргументы функции update (идентификаторы, токены).
+
+    Returns:
+        list: Ответы API в порядке пачек.
+
+    Example:
+        >>> await gather_batches(_EXECUTOR, update_stocks, divide(stocks, 100), client_id, seller_token)
+        [{'result': [...]}, {'result': [...]}]
+
+    Example of incorrect use:
+        >>> await gather_batches(_EXECUTOR, update_stocks, divide(stocks, 100), "wrong_id", "invalid_token")
+        requests.exceptions.HTTPError: 401 Unauthorized
+    """
+    loop = asyncio.get_running_loop()
+    return await asyncio.gather(
+        *[loop.run_in_executor(executor, update, batch, *args) for batch in batches]
+    )
 
 
 async def upload_prices(watch_remnants, client_id, seller_token):
-    offer_ids = get_offer_ids(client_id, seller_token)
+    loop = asyncio.get_running_loop()
+    offer_ids = await loop.run_in_executor(
+        _EXECUTOR, get_offer_ids, client_id, seller_token
+    )
     prices = create_prices(watch_remnants, offer_ids)
-    for some_price in list(divide(prices, 1000)):
-        update_price(some_price, client_id, seller_token)
+    await gather_batches(
+        _EXECUTOR, update_price, divide(prices, 1000), client_id, seller_token
+    )
     return prices
 
 
 async def upload_stocks(watch_remnants, client_id, seller_token):
-    offer_ids = get_offer_ids(client_id, seller_token)
+    loop = asyncio.get_running_loop()
+    offer_ids = await loop.run_in_executor(
+        _EXECUTOR, get_offer_ids, client_id, seller_token
+    )
     stocks = create_stocks(watch_remnants, offer_ids)
-    for some_stock in list(divide(stocks, 100)):
-        update_stocks(some_stock, client_id, seller_token)
+    await gather_batches(
+        _EXECUTOR, update_stocks, divide(stocks, 100), client_id, seller_token
+    )
     not_empty = list(filter(lambda stock: (stock.get("stock") != 0), stocks))
     return not_empty, stocks
 
 
+async def upload_stocks_and_prices(client_id, seller_token):
+    """Скачать остатки и обновить остатки и цены товаров на Озон.
+
+    Файл остатков и артикулы магазина загружаются одновременно, затем пачки
+    остатков и цен отправляются в API параллельно.
+
+    Args:
+        client_id (str): Идентификатор клиента для аутентификации API.
+        seller_token (str): API-ключ продавца для аутентификации.
+
+    Returns:
+        tuple: Пара списков (stocks, prices), отправленных в Озон.
+
+    Example:
+        >>> stocks, prices = asyncio.run(upload_stocks_and_prices("your_client_id", "your_seller_token"))
+    """
+    # Артикулы и файл остатков не зависят друг от друга — качаем параллельно.
+    loop = asyncio.get_running_loop()
+    offer_ids, watch_remnants = await asyncio.gather(
+        loop.run_in_executor(_EXECUTOR, get_offer_ids, client_id, seller_token),
+        asyncio.to_thread(download_stock),
+    )
+    stocks, prices = build_stocks_and_prices(watch_remnants, offer_ids)
+    await asyncio.gather(
+        gather_batches(
+            _EXECUTOR, update_stocks, divide(stocks, 100), client_id, seller_token
+        ),
+        gather_batches(
+            _EXECUTOR, update_price, divide(prices, 900), client_id, seller_token
+        ),
+    )
+    return stocks, prices
+
+
 def main():
     env = Env()
     seller_token = env.str("SELLER_TOKEN")
     client_id = env.str("CLIENT_ID")
     try:
-        offer_ids = get_offer_ids(client_id, seller_token)
-        watch_remnants = download_stock()
-        # Обновить остатки
-        stocks = create_stocks(watch_remnants, offer_ids)
-        for some_stock in list(divide(stocks, 100)):
-            update_stocks(some_stock, client_id, seller_token)
-        # Поменять цены
-        prices = create_prices(watch_remnants, offer_ids)
-        for some_price in list(divide(prices, 900)):
-            update_price(some_price, client_id, seller_token)
+        asyncio.run(upload_stocks_and_prices(client_id, seller_token))
     except requests.exceptions.ReadTimeout:
         print("Превышено время ожидания...")
     except requests.exceptions.ConnectionError as error: